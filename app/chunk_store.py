@@ -0,0 +1,514 @@
+# Compact columnar store for chunks.jsonl.
+# It will:
+# - keep every chunk's content in one utf-8 blob, indexed by offsets
+# - dictionary-encode low-cardinality metadata (taxonomy, product, section, url, ...) into int32 code columns
+# - keep per-row metadata (chunk_id, updated_at, ...) as utf-8 blobs with offsets, like content,
+#   or as typed numpy columns when the field holds only ints, floats or bools
+# - keep embeddings (optional) as one contiguous float32 matrix
+# - memory-map all of it on open, so nothing is parsed per row
+#
+# Layout of a store directory (e.g. ./dataset/chunks.store):
+#   manifest.json        count, source JSONL size/mtime, embedding model/dim, dictionaries of the dictionary-encoded fields
+#   content.bin          concatenated utf-8 content
+#   content_offsets.npy  int64[count + 1], row i = content.bin[off[i]:off[i+1]]
+#   meta_<field>.npy     dictionary field: int32[count], index into its dictionary (-1 = missing)
+#   meta_<field>.bin     string field: blob + meta_<field>_offsets.npy, same layout as content
+#   meta_<field>.npy     numeric field: bool/int64/float64[count] values, typed per the manifest
+#   meta_<field>_null.npy  string/numeric field: bool[count], only written if some rows lack the field
+#   embeddings.npy       float32[count, dim], L2-normalized so cosine similarity is a plain dot product
+
+import os, json, shutil, tempfile, argparse
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+FORMAT_NAME, FORMAT_VERSION = "chunkstore", 1
+MISSING = -1  # code for a metadata field that is absent / null on a row
+
+# Metadata values the store can hold; lists/dicts are rejected by write_store().
+SCALAR_TYPES = (str, bool, int, float)
+
+# Fields that repeat across many chunks; everything else is stored per row.
+DICT_FIELDS = (
+    "taxonomy_id", "product_id", "section_title", "source_url", "price_range",
+    "language", "visibility", "source_type", "version",
+)
+
+# Per-row fields holding a single non-str scalar type get a typed column instead of a dictionary.
+NUMERIC_DTYPES = {bool: np.bool_, int: np.int64, float: np.float64}
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+
+
+def _column_file(field: str) -> str:
+    return f"meta_{field}.npy"
+
+
+def _value_key(value: Any) -> Any:
+    """Dictionary key that keeps True, 1 and 1.0 apart (they hash equal in Python)."""
+    return (type(value), value)
+
+
+def _write_strings(out_dir: str, name: str, values: List[Optional[str]]) -> None:
+    """Write strings as <name>.bin + <name>_offsets.npy (+ <name>_null.npy if any value is None)."""
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    nulls = np.zeros(len(values), dtype=bool)
+    with open(os.path.join(out_dir, f"{name}.bin"), "wb") as f:
+        pos = 0
+        for i, value in enumerate(values):
+            if value is None:
+                nulls[i] = True
+            else:
+                raw = value.encode("utf-8")
+                f.write(raw)
+                pos += len(raw)
+            offsets[i + 1] = pos
+    np.save(os.path.join(out_dir, f"{name}_offsets.npy"), offsets)
+    if nulls.any():
+        np.save(os.path.join(out_dir, f"{name}_null.npy"), nulls)
+
+
+class _StringColumn:
+    """Memory-mapped view of strings written by _write_strings()."""
+    def __init__(self, store_dir: str, name: str):
+        self.offsets = np.load(os.path.join(store_dir, f"{name}_offsets.npy"), mmap_mode="r")
+        blob_path = os.path.join(store_dir, f"{name}.bin")
+        if os.path.getsize(blob_path):
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            self.blob = np.empty(0, dtype=np.uint8)  # mmap of an empty file is not allowed
+        null_path = os.path.join(store_dir, f"{name}_null.npy")
+        self.nulls = np.load(null_path, mmap_mode="r") if os.path.exists(null_path) else None
+
+    def get(self, i: int) -> Optional[str]:
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def isin(self, wanted: List[Any]) -> np.ndarray:
+        """Rows whose string equals one of `wanted` (only rows of matching byte length are compared)."""
+        keep = np.zeros(len(self.offsets) - 1, dtype=bool)
+        starts = np.asarray(self.offsets[:-1])
+        lengths = np.diff(self.offsets)
+        for value in wanted:
+            if not isinstance(value, str):
+                continue
+            raw = np.frombuffer(value.encode("utf-8"), dtype=np.uint8)
+            rows = np.flatnonzero(lengths == raw.size)
+            if rows.size and raw.size:
+                # gather all candidate strings as one [rows, len] byte matrix and compare at once
+                chars = np.asarray(self.blob)[starts[rows, None] + np.arange(raw.size)]
+                rows = rows[(chars == raw).all(axis=1)]
+            keep[rows] = True
+        if self.nulls is not None:
+            keep &= ~self.nulls
+        return keep
+
+
+def _numeric_kind(column: List[Any]) -> Optional[type]:
+    """The single bool/int/float type of a column (ignoring None) if it fits a typed array, else None."""
+    kinds = {type(v) for v in column if v is not None}
+    if len(kinds) != 1:
+        return None
+    kind = kinds.pop()
+    if kind not in NUMERIC_DTYPES:
+        return None
+    if kind is int and not all(v is None or INT64_MIN <= v <= INT64_MAX for v in column):
+        return None
+    return kind
+
+
+class _NumericColumn:
+    """Memory-mapped typed column written by _write_files() for per-row numeric fields."""
+    def __init__(self, store_dir: str, field: str, kind: type):
+        self.kind = kind
+        self.values = np.load(os.path.join(store_dir, _column_file(field)), mmap_mode="r")
+        null_path = os.path.join(store_dir, f"meta_{field}_null.npy")
+        self.nulls = np.load(null_path, mmap_mode="r") if os.path.exists(null_path) else None
+
+    def get(self, i: int) -> Any:
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        return self.kind(self.values[i])
+
+    def isin(self, wanted: List[Any]) -> np.ndarray:
+        """Rows equal to one of `wanted`; like dictionary fields, the Python type must match too."""
+        same_type = [v for v in wanted if type(v) is self.kind]
+        keep = np.isin(self.values, np.array(same_type, dtype=self.values.dtype))
+        if self.nulls is not None:
+            keep &= ~self.nulls
+        return keep
+
+
+def source_fingerprint(path: str) -> Dict[str, int]:
+    """Size and mtime of the JSONL a store is built from, used to detect stale stores."""
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def is_store(path: str) -> bool:
+    """True if `path` is a directory holding a chunk store manifest."""
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("format") == FORMAT_NAME
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+# ----------- writing -----------
+def _write_files(
+    dataset: List[Dict[str, Any]],
+    out_dir: str,
+    embeddings: Optional[np.ndarray],
+    model_name: Optional[str],
+    source: Optional[Dict[str, int]],
+) -> None:
+    """Write all store files into an existing, empty `out_dir` (manifest last)."""
+    count = len(dataset)
+    _write_strings(out_dir, "content", [item.get("content") or "" for item in dataset])
+
+    # metadata fields in first-seen order
+    fields: List[str] = []
+    for item in dataset:
+        for key in item.get("metadata") or {}:
+            if key not in fields:
+                fields.append(key)
+
+    dictionaries: Dict[str, List[Any]] = {}
+    numeric: Dict[str, str] = {}
+    for field in fields:
+        column = [(item.get("metadata") or {}).get(field) for item in dataset]
+        for i, value in enumerate(column):
+            if value is not None and not isinstance(value, SCALAR_TYPES):
+                raise ValueError(
+                    f"Row {i}: metadata '{field}' must be a str, bool, int or float, "
+                    f"got {type(value).__name__}."
+                )
+        if field not in DICT_FIELDS:
+            if all(v is None or isinstance(v, str) for v in column):
+                _write_strings(out_dir, f"meta_{field}", column)
+                continue
+            kind = _numeric_kind(column)
+            if kind is not None:
+                nulls = np.array([v is None for v in column], dtype=bool)
+                np.save(
+                    os.path.join(out_dir, _column_file(field)),
+                    np.array([kind() if v is None else v for v in column], dtype=NUMERIC_DTYPES[kind]),
+                )
+                if nulls.any():
+                    np.save(os.path.join(out_dir, f"meta_{field}_null.npy"), nulls)
+                numeric[field] = kind.__name__
+                continue
+            # mixed-type fields fall back to dictionary encoding
+
+        values: List[Any] = []
+        lookup: Dict[Any, int] = {}
+        codes = np.full(count, MISSING, dtype=np.int32)
+        for i, value in enumerate(column):
+            if value is None:
+                continue
+            key = _value_key(value)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(values)
+                values.append(value)
+            codes[i] = code
+        np.save(os.path.join(out_dir, _column_file(field)), codes)
+        dictionaries[field] = values
+
+    if embeddings is not None:
+        np.save(os.path.join(out_dir, EMBEDDINGS_FILE), embeddings)
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "count": count,
+        "source": source,
+        "fields": fields,
+        "dictionaries": dictionaries,
+        "numeric": numeric,
+        "embedding_model": model_name if embeddings is not None else None,
+        "embedding_dim": int(embeddings.shape[1]) if embeddings is not None else None,
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+
+def write_store(
+    dataset: List[Dict[str, Any]],
+    out_dir: str,
+    embeddings: Optional[np.ndarray] = None,
+    model_name: Optional[str] = None,
+    source: Optional[Dict[str, int]] = None,
+) -> str:
+    """
+    Write chunk dicts (as loaded from chunks.jsonl) to a columnar store.
+    Args:
+        dataset (list): List of dicts with 'content' and 'metadata'
+        out_dir (str): Store directory, created or atomically replaced
+        embeddings (np.ndarray): Optional [len(dataset), dim] matrix, row-aligned with dataset
+        model_name (str): Embedding model that produced `embeddings`
+        source (dict): source_fingerprint() of the JSONL `dataset` was read from
+    Returns:
+        str: out_dir
+    """
+    count = len(dataset)
+    if embeddings is not None:
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[0] != count:
+            raise ValueError(f"embeddings must have shape ({count}, dim), got {embeddings.shape}.")
+        # normalize once here, so search can score the memory-mapped matrix as-is
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+
+    # Build in a sibling temp dir and swap it in, so a crash never leaves a
+    # manifest describing files from a different build.
+    out_dir = os.path.abspath(out_dir)
+    # Only ever replace a previous store (or an empty dir), never e.g. the dataset folder itself.
+    if os.path.exists(out_dir) and not (
+        is_store(out_dir) or (os.path.isdir(out_dir) and not os.listdir(out_dir))
+    ):
+        raise ValueError(f"{out_dir} exists and is not a {FORMAT_NAME} store; refusing to replace it.")
+    parent = os.path.dirname(out_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=os.path.basename(out_dir) + ".tmp-")
+    try:
+        _write_files(dataset, tmp_dir, embeddings, model_name, source)
+        # mkdtemp() creates the dir as 0700; give it the permissions os.makedirs() would
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_dir, 0o777 & ~umask)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    old_dir = None
+    if os.path.exists(out_dir):
+        old_dir = tmp_dir + ".old"
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+
+# ----------- reading -----------
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of a store written by write_store().
+    Rows come back in the same {'content', 'metadata'} shape as chunks.jsonl.
+    """
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_NAME or manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{store_dir} is not a {FORMAT_NAME} v{FORMAT_VERSION} store.")
+
+        self.count: int = manifest["count"]
+        self.source: Optional[Dict[str, int]] = manifest.get("source")
+        self.fields: List[str] = manifest["fields"]
+        self.dictionaries: Dict[str, List[Any]] = manifest["dictionaries"]
+        self.embedding_model: Optional[str] = manifest.get("embedding_model")
+        self.embedding_dim: Optional[int] = manifest.get("embedding_dim")
+        # value -> code per dictionary field, built on first filter use
+        self._codes: Dict[str, Dict[Any, int]] = {}
+
+        self._content = _StringColumn(store_dir, "content")
+        self.columns: Dict[str, np.ndarray] = {
+            f: np.load(os.path.join(store_dir, _column_file(f)), mmap_mode="r") for f in self.dictionaries
+        }
+        kinds = {k.__name__: k for k in NUMERIC_DTYPES}
+        self.numeric_columns: Dict[str, _NumericColumn] = {
+            f: _NumericColumn(store_dir, f, kinds[k]) for f, k in manifest.get("numeric", {}).items()
+        }
+        self.string_columns: Dict[str, _StringColumn] = {
+            f: _StringColumn(store_dir, f"meta_{f}")
+            for f in self.fields if f not in self.dictionaries and f not in self.numeric_columns
+        }
+
+        emb_path = os.path.join(store_dir, EMBEDDINGS_FILE)
+        self.embeddings: Optional[np.ndarray] = (
+            np.load(emb_path, mmap_mode="r") if os.path.exists(emb_path) else None
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return {"content": self.content(i), "metadata": self.metadata(i)}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.count):
+            yield self[i]
+
+    def matches_source(self, jsonl_path: str) -> bool:
+        """True if the store was built from `jsonl_path` as it is on disk now."""
+        if self.source is None or not os.path.exists(jsonl_path):
+            return False
+        return self.source == source_fingerprint(jsonl_path)
+
+    def content(self, i: int) -> str:
+        return self._content.get(i)
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        md = {}
+        for field in self.fields:
+            if field in self.dictionaries:
+                code = int(self.columns[field][i])
+                value = self.dictionaries[field][code] if code != MISSING else None
+            elif field in self.numeric_columns:
+                value = self.numeric_columns[field].get(i)
+            else:
+                value = self.string_columns[field].get(i)
+            if value is not None:
+                md[field] = value
+        return md
+
+    def _code_lookup(self, field: str) -> Dict[Any, int]:
+        lookup = self._codes.get(field)
+        if lookup is None:
+            lookup = self._codes[field] = {_value_key(v): i for i, v in enumerate(self.dictionaries[field])}
+        return lookup
+
+    def mask(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Boolean row mask for a Pinecone-style filter (as built by retrieval.retriever.build_filter).
+        Supports {"field": value}, {"field": {"$eq": value}}, {"field": {"$in": [...]}} and "$and".
+        """
+        keep = np.ones(self.count, dtype=bool)
+        for field, cond in (filters or {}).items():
+            if field == "$and":
+                if not isinstance(cond, (list, tuple)):
+                    raise ValueError(f"'$and' expects a list of filters, got {type(cond).__name__}.")
+                for clause in cond:
+                    keep &= self.mask(clause)
+                continue
+            if isinstance(cond, dict):
+                if set(cond) == {"$eq"}:
+                    wanted = [cond["$eq"]]
+                elif set(cond) == {"$in"}:
+                    if not isinstance(cond["$in"], (list, tuple)):
+                        raise ValueError(f"'$in' for '{field}' expects a list, got {type(cond['$in']).__name__}.")
+                    wanted = list(cond["$in"])
+                else:
+                    raise ValueError(f"Unsupported filter operator for '{field}': {sorted(cond)}")
+            else:
+                wanted = [cond]
+            for value in wanted:
+                if not isinstance(value, SCALAR_TYPES):
+                    raise ValueError(
+                        f"Filter value for '{field}' must be a str, bool, int or float, "
+                        f"got {type(value).__name__}."
+                    )
+
+            if field in self.string_columns:
+                keep &= self.string_columns[field].isin(wanted)
+                continue
+            if field in self.numeric_columns:
+                keep &= self.numeric_columns[field].isin(wanted)
+                continue
+            lookup = self._code_lookup(field) if field in self.dictionaries else {}
+            codes = [lookup[_value_key(v)] for v in wanted if _value_key(v) in lookup]
+            if not codes:
+                keep[:] = False  # field or value never occurs in the catalog
+            else:
+                keep &= np.isin(self.columns[field], codes)
+        return keep
+
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Cosine-similarity search over the stored embeddings.
+        Returns matches in the same shape as Retriever.search: [{id, score, content, metadata}, ...]
+        """
+        if self.embeddings is None:
+            raise ValueError(f"{self.store_dir} has no embeddings; rebuild it with --embed.")
+        q = np.asarray(query_vector, dtype=np.float32)
+        if q.shape != (self.embeddings.shape[1],):
+            raise ValueError(f"Query vector has dim {q.shape}, store has dim {self.embeddings.shape[1]}.")
+
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+
+        rows = np.flatnonzero(self.mask(filters))
+        if rows.size == 0:
+            return []
+        # stored rows are unit vectors; score the mmapped matrix directly (only count floats allocated)
+        scores = (np.asarray(self.embeddings) @ q)[rows]
+        k = min(top_k, rows.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+
+        hits: List[Dict[str, Any]] = []
+        for j in best:
+            i = int(rows[j])
+            md = self.metadata(i)
+            content = self.content(i)
+            hits.append({
+                "id": md.get("chunk_id"),
+                "score": float(scores[j]),
+                "content": content,
+                "metadata": {**md, "content": content},
+            })
+        return hits
+
+    def to_vectors(self, model_name: Optional[str] = None, dim: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Build Pinecone upsert dicts from the stored embeddings (same shape as Embedder.embed_dataset).
+        Values are the normalized vectors, which is equivalent under the cosine metric.
+        Args:
+            model_name (str): If given, the stored embeddings must come from this model
+            dim (int): If given (e.g. PineconeClient.dim), the stored embeddings must have this dim
+        Returns:
+            list: List of dicts ready for Pinecone upsert
+        """
+        if self.embeddings is None:
+            raise ValueError(f"{self.store_dir} has no embeddings; rebuild it with --embed.")
+        if model_name is not None and self.embedding_model != model_name:
+            raise ValueError(
+                f"{self.store_dir} was embedded with '{self.embedding_model}', expected '{model_name}'."
+            )
+        if dim is not None and self.embedding_dim != dim:
+            raise ValueError(f"{self.store_dir} has embedding dim {self.embedding_dim}, expected {dim}.")
+        vectors = []
+        for i in range(self.count):
+            md = self.metadata(i)
+            vectors.append({
+                "id": md.get("chunk_id"),
+                "values": self.embeddings[i].tolist(),
+                "metadata": {**md, "content": self.content(i)},
+            })
+        return vectors
+
+
+# ----------- main -----------
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jsonl", required=True, help="Input JSONL file, e.g. ./dataset/chunks.jsonl")
+    ap.add_argument("--out", required=True, help="Output store directory, e.g. ./dataset/chunks.store")
+    ap.add_argument("--embed", action="store_true", help="Also compute and store embeddings.")
+    args = ap.parse_args()
+
+    source = source_fingerprint(args.jsonl)  # taken before reading, so later edits mark the store stale
+    with open(args.jsonl, "r", encoding="utf-8") as f:
+        dataset = [json.loads(line) for line in f if line.strip()]
+
+    embeddings, model_name = None, None
+    if args.embed:
+        from embedder import Embedder
+        embedder = Embedder()
+        embeddings = embedder.embed_texts([item.get("content", "") for item in dataset])
+        model_name = embedder.model_name
+
+    write_store(dataset, args.out, embeddings=embeddings, model_name=model_name, source=source)
+    print(f"Wrote {len(dataset)} chunks to {args.out}" + (" (with embeddings)" if args.embed else ""))
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 from sentence_transformers import SentenceTransformer
 
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
 class Embedder:
     """
     Embedder for generating vector embeddings from text using free models.
     """
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
         self.dim = self.model.get_sentence_embedding_dimension()
 
@@ -18,6 +21,17 @@ class Embedder:
         """
         return self.model.encode(text).tolist()
 
+    def embed_texts(self, texts: list, batch_size: int = 64):
+        """
+        Embed many texts in batches.
+        Args:
+            texts (list): Texts to embed
+            batch_size (int): Encoder batch size
+        Returns:
+            np.ndarray: float32 matrix of shape [len(texts), dim]
+        """
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype("float32")
+
     def embed_dataset(self, dataset: list) -> list:
         """
         Embed a list of items containing 'content' and 'metadata'.
@@ -1,6 +1,8 @@
+import os
 import json
-from embedder import Embedder
+from embedder import Embedder, DEFAULT_MODEL
 from pinecone_client import PineconeClient  
+from chunk_store import ChunkStore, is_store
 import pinecone 
 
 
@@ -15,9 +17,33 @@ def load_jsonl(file_path: str) -> list:
             dataset.append(item)
     return dataset
 
-if __name__ == "__main__":
-    # Path to your JSONL file
-    jsonl_file = "C:\\Users\\debna\\OneDrive\\Desktop\\MediaSoft\\dataset\\chunks.jsonl"  
+def load_store(store_dir: str) -> ChunkStore:
+    """
+    Memory-map a columnar chunk store (see chunk_store.py) instead of parsing JSONL
+    """
+    return ChunkStore(store_dir)
+
+def build_vectors(jsonl_file: str, store_dir: str, dim: int) -> list:
+    """
+    Build Pinecone upsert vectors, preferring the compact store when it is up to date with
+    the JSONL (its embeddings are reused if they come from DEFAULT_MODEL and have `dim`)
+    """
+    store = None
+    if is_store(store_dir):
+        store = load_store(store_dir)
+        if not store.matches_source(jsonl_file):
+            print(f"[WARN] {store_dir} is out of date with {jsonl_file}; falling back to JSONL. "
+                  f"Rebuild it with app/chunk_store.py.")
+            store = None
+
+    if store is not None:
+        # Load dataset (memory-mapped, no per-row parsing)
+        print(f"Loaded {len(store)} items from {store_dir}.")
+
+        if store.embeddings is not None and store.embedding_model == DEFAULT_MODEL:
+            # Reuse stored embeddings (raises if their dim does not match the index)
+            return store.to_vectors(model_name=DEFAULT_MODEL, dim=dim)
+        return Embedder().embed_dataset(store)
 
     # Load dataset
     data = load_jsonl(jsonl_file)
@@ -27,10 +53,19 @@ if __name__ == "__main__":
     embedder = Embedder()
 
     # Generate embeddings
-    vectors = embedder.embed_dataset(data)
+    return embedder.embed_dataset(data)
+
+if __name__ == "__main__":
+    # Path to your JSONL file
+    jsonl_file = "C:\\Users\\debna\\OneDrive\\Desktop\\MediaSoft\\dataset\\chunks.jsonl"  
+    # Compact store built by: python app/chunk_store.py --jsonl <jsonl> --out <store> --embed
+    store_dir = os.path.splitext(jsonl_file)[0] + ".store"
+
+    pc = PineconeClient()
+
+    vectors = build_vectors(jsonl_file, store_dir, pc.dim)
     print(vectors)
     print(f"Generated embeddings for {len(vectors)} items.")
 
-    pc = PineconeClient()
     # Upsert vectors to Pinecone
     pc.upsert_vectors(vectors)
\ No newline at end of file
@@ -1,7 +1,8 @@
 from typing import Any, Dict, List, Optional
 
-from app.embedder import Embedder
+from app.embedder import Embedder, DEFAULT_MODEL
 from app.pinecone_client import PineconeClient
+from app.chunk_store import ChunkStore
 
 
 class Retriever:
@@ -49,6 +50,30 @@ class Retriever:
         return hits
 
 
+class LocalRetriever(Retriever):
+    """
+    Same interface as Retriever, but searches a memory-mapped ChunkStore instead of Pinecone.
+    """
+    def __init__(self, store_dir: str = "dataset/chunks.store", top_k: int = 4, embedder: Optional[Embedder] = None):
+        self.top_k = top_k
+        self.store = ChunkStore(store_dir)
+        # must match the model the store was embedded with
+        self.embedder = embedder or Embedder(self.store.embedding_model or DEFAULT_MODEL)
+
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns normalized matches: [{id, score, content, metadata}, ...]
+        Filters use the same shape as build_filter().
+        """
+        qvec = self.embed_query(query)
+        return self.store.search(qvec, top_k=top_k or self.top_k, filters=filters)
+
+
 def build_filter(
     taxonomy_id: Optional[str] = None,
     product_id: Optional[str] = None,
@@ -0,0 +1,244 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.chunk_store import ChunkStore, source_fingerprint, write_store
+
+CHUNKS_JSONL = os.path.join(os.path.dirname(__file__), "..", "dataset", "chunks.jsonl")
+
+
+def load_chunks():
+    with open(CHUNKS_JSONL, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture(scope="module")
+def chunks():
+    return load_chunks()
+
+
+@pytest.fixture
+def store(chunks, tmp_path):
+    return ChunkStore(write_store(chunks, str(tmp_path / "chunks.store")))
+
+
+def expected_rows(chunks, **eq):
+    return [i for i, c in enumerate(chunks) if all(c["metadata"].get(k) == v for k, v in eq.items())]
+
+
+# ----------- round trip -----------
+def test_round_trip_matches_jsonl(chunks, store):
+    assert len(store) == len(chunks)
+    assert list(store) == chunks
+
+
+def test_manifest_only_holds_repeated_values(store):
+    assert "chunk_id" not in store.dictionaries
+    assert "updated_at" not in store.dictionaries
+    assert store.dictionaries["version"] == ["v1"]
+    assert "product_id" in store.dictionaries
+    assert len(store.dictionaries["section_title"]) == 3
+
+
+def test_scalar_types_are_kept_distinct(tmp_path):
+    rows = [
+        {"content": "a", "metadata": {"f": True}},
+        {"content": "b", "metadata": {"f": 1}},
+        {"content": "c", "metadata": {"f": 1.0}},
+        {"content": "d", "metadata": {}},
+    ]
+    store = ChunkStore(write_store(rows, str(tmp_path / "s")))
+    assert list(store) == rows
+    assert [type(store[i]["metadata"]["f"]) for i in range(3)] == [bool, int, float]
+    assert np.flatnonzero(store.mask({"f": {"$eq": 1}})).tolist() == [1]
+
+
+def test_per_row_numbers_use_typed_columns(tmp_path):
+    rows = [
+        {"content": "a", "metadata": {"n": 1, "price": 9.5, "flag": True}},
+        {"content": "b", "metadata": {"n": 2, "price": 0.0}},
+        {"content": "c", "metadata": {"n": 2**40, "flag": False}},
+    ]
+    store = ChunkStore(write_store(rows, str(tmp_path / "s")))
+    assert store.dictionaries == {}
+    assert set(store.numeric_columns) == {"n", "price", "flag"}
+    assert list(store) == rows
+    assert [type(store[i]["metadata"]["n"]) for i in range(3)] == [int, int, int]
+    assert np.flatnonzero(store.mask({"n": {"$in": [2, 2**40]}})).tolist() == [1, 2]
+    assert np.flatnonzero(store.mask({"price": 0.0})).tolist() == [1]
+    assert np.flatnonzero(store.mask({"flag": False})).tolist() == [2]
+    assert not store.mask({"n": 2.0}).any()  # type must match, as for dictionary fields
+
+
+def test_non_scalar_metadata_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="tags"):
+        write_store([{"content": "a", "metadata": {"tags": ["x"]}}], str(tmp_path / "s"))
+    assert not os.path.exists(tmp_path / "s")
+    assert os.listdir(tmp_path) == []
+
+
+def test_empty_dataset(tmp_path):
+    store = ChunkStore(write_store([], str(tmp_path / "s"), embeddings=np.zeros((0, 4))))
+    assert len(store) == 0
+    assert list(store) == []
+    assert store.mask({"taxonomy_id": "cat-pharmacy"}).tolist() == []
+    assert store.search([1, 0, 0, 0], top_k=3) == []
+
+
+def test_rewrite_replaces_previous_store(chunks, tmp_path):
+    out = str(tmp_path / "s")
+    write_store(chunks, out, embeddings=np.ones((len(chunks), 4)))
+    write_store(chunks[:2], out)
+    store = ChunkStore(out)
+    assert list(store) == chunks[:2]
+    assert store.embeddings is None
+    assert os.listdir(tmp_path) == ["s"]
+
+
+def test_store_dir_honours_umask(chunks, tmp_path):
+    umask = os.umask(0o022)
+    try:
+        out = write_store(chunks[:2], str(tmp_path / "s"))
+    finally:
+        os.umask(umask)
+    assert os.stat(out).st_mode & 0o777 == 0o755
+
+
+def test_refuses_to_replace_non_store_dir(chunks, tmp_path):
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+    (dataset_dir / "chunks.jsonl").write_text("{}\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="not a chunkstore store"):
+        write_store(chunks, str(dataset_dir))
+    assert os.listdir(dataset_dir) == ["chunks.jsonl"]
+    assert os.listdir(tmp_path) == ["dataset"]
+
+    plain_file = tmp_path / "file.txt"
+    plain_file.write_text("keep me", encoding="utf-8")
+    with pytest.raises(ValueError):
+        write_store(chunks, str(plain_file))
+    assert plain_file.read_text(encoding="utf-8") == "keep me"
+
+
+def test_writes_into_empty_dir(chunks, tmp_path):
+    out = tmp_path / "empty"
+    out.mkdir()
+    assert list(ChunkStore(write_store(chunks[:3], str(out)))) == chunks[:3]
+
+
+# ----------- filters -----------
+def test_mask_with_build_filter_shape(chunks, store):
+    flt = {"$and": [{"taxonomy_id": {"$eq": "cat-pharmacy"}}, {"section_title": {"$eq": "Features"}}]}
+    got = np.flatnonzero(store.mask(flt)).tolist()
+    assert got == expected_rows(chunks, taxonomy_id="cat-pharmacy", section_title="Features")
+    assert got
+
+
+def test_mask_on_per_row_field(chunks, store):
+    chunk_id = chunks[7]["metadata"]["chunk_id"]
+    assert np.flatnonzero(store.mask({"chunk_id": {"$eq": chunk_id}})).tolist() == [7]
+    product_id = chunks[7]["metadata"]["product_id"]
+    assert np.flatnonzero(store.mask({"product_id": product_id})).tolist() == expected_rows(
+        chunks, product_id=product_id
+    )
+
+
+def test_mask_on_string_column_edge_cases(tmp_path):
+    rows = [
+        {"content": "a", "metadata": {"note": "abc"}},
+        {"content": "b", "metadata": {"note": "abd"}},
+        {"content": "c", "metadata": {"note": ""}},
+        {"content": "d", "metadata": {}},
+        {"content": "e", "metadata": {"note": "abc"}},
+    ]
+    store = ChunkStore(write_store(rows, str(tmp_path / "s")))
+    assert "note" in store.string_columns
+    assert np.flatnonzero(store.mask({"note": "abc"})).tolist() == [0, 4]
+    assert np.flatnonzero(store.mask({"note": {"$in": ["abd", ""]}})).tolist() == [1, 2]
+    assert not store.mask({"note": "ab"}).any()
+
+
+def test_mask_in(chunks, store):
+    flt = {"section_title": {"$in": ["Overview", "Benefits", "Nope"]}}
+    got = np.flatnonzero(store.mask(flt)).tolist()
+    assert got == [i for i, c in enumerate(chunks) if c["metadata"]["section_title"] in ("Overview", "Benefits")]
+
+
+def test_mask_unknown_field_or_value(store):
+    assert not store.mask({"no_such_field": {"$eq": "x"}}).any()
+    assert not store.mask({"taxonomy_id": {"$eq": "cat-does-not-exist"}}).any()
+    assert not store.mask({"chunk_id": {"$eq": "ch:nope"}}).any()
+    assert store.mask(None).all()
+
+
+def test_mask_unsupported_operator(store):
+    with pytest.raises(ValueError):
+        store.mask({"taxonomy_id": {"$ne": "cat-pharmacy"}})
+
+
+@pytest.mark.parametrize("flt", [
+    {"taxonomy_id": {"$in": "cat-pharmacy"}},
+    {"taxonomy_id": {"$in": ["cat-pharmacy", ["nested"]]}},
+    {"taxonomy_id": {"$eq": ["cat-pharmacy"]}},
+    {"chunk_id": {"$eq": {"x": 1}}},
+    {"taxonomy_id": None},
+    {"$and": {"taxonomy_id": "cat-pharmacy"}},
+])
+def test_mask_rejects_malformed_values(store, flt):
+    with pytest.raises(ValueError):
+        store.mask(flt)
+
+
+# ----------- search / ingestion -----------
+@pytest.fixture
+def embedded(chunks, tmp_path):
+    rng = np.random.default_rng(0)
+    emb = rng.normal(size=(len(chunks), 8)).astype(np.float32)
+    out = str(tmp_path / "s")
+    write_store(chunks, out, embeddings=emb, model_name="test-model", source=source_fingerprint(CHUNKS_JSONL))
+    return ChunkStore(out), emb
+
+
+def test_search_orders_by_cosine(chunks, embedded):
+    store, emb = embedded
+    q = emb[5] * 3.0
+    hits = store.search(q, top_k=5)
+    unit = emb / np.linalg.norm(emb, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (q / np.linalg.norm(q))))[:5]
+    assert [h["id"] for h in hits] == [chunks[i]["metadata"]["chunk_id"] for i in expected]
+    assert hits[0]["id"] == chunks[5]["metadata"]["chunk_id"]
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+    assert hits[0]["content"] == chunks[5]["content"]
+    assert hits[0]["metadata"] == {**chunks[5]["metadata"], "content": chunks[5]["content"]}
+
+
+def test_search_top_k_larger_than_matches(chunks, embedded):
+    store, emb = embedded
+    flt = {"taxonomy_id": "cat-pharmacy"}
+    hits = store.search(emb[0], top_k=50, filters=flt)
+    assert sorted(h["id"] for h in hits) == sorted(
+        chunks[i]["metadata"]["chunk_id"] for i in expected_rows(chunks, taxonomy_id="cat-pharmacy")
+    )
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+
+
+def test_to_vectors_checks_model_and_dim(chunks, embedded):
+    store, _ = embedded
+    vectors = store.to_vectors(model_name="test-model", dim=8)
+    assert [v["id"] for v in vectors] == [c["metadata"]["chunk_id"] for c in chunks]
+    with pytest.raises(ValueError):
+        store.to_vectors(model_name="other-model")
+    with pytest.raises(ValueError):
+        store.to_vectors(dim=384)
+
+
+def test_matches_source(embedded, tmp_path):
+    store, _ = embedded
+    assert store.matches_source(CHUNKS_JSONL)
+    other = tmp_path / "other.jsonl"
+    other.write_text("{}\n", encoding="utf-8")
+    assert not store.matches_source(str(other))
+    assert not store.matches_source(str(tmp_path / "missing.jsonl"))
@@ -0,0 +1,169 @@
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from app.chunk_store import ChunkStore, source_fingerprint, write_store
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+APP_DIR = os.path.join(ROOT, "app")
+CHUNKS_JSONL = os.path.join(ROOT, "dataset", "chunks.jsonl")
+DIM = 8
+
+
+@pytest.fixture
+def isolated_modules(monkeypatch):
+    """
+    Import app/retrieval modules against stand-ins for sentence-transformers, pinecone and
+    dotenv when those are not installed (the tests never call into them), and drop every
+    module imported during the test afterwards.
+    """
+    stand_ins = {
+        "sentence_transformers": {"SentenceTransformer": object},
+        "pinecone": {"Pinecone": object, "ServerlessSpec": object},
+        "dotenv": {"load_dotenv": lambda *args, **kwargs: None},
+    }
+    for name, attrs in stand_ins.items():
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            module = types.ModuleType(name)
+            for attr, value in attrs.items():
+                setattr(module, attr, value)
+            monkeypatch.setitem(sys.modules, name, module)
+
+    before = set(sys.modules)
+    yield
+    for name in set(sys.modules) - before:
+        del sys.modules[name]
+
+
+@pytest.fixture
+def chunks():
+    with open(CHUNKS_JSONL, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def embeddings(chunks):
+    return np.random.default_rng(1).normal(size=(len(chunks), DIM)).astype(np.float32)
+
+
+class StubEmbedder:
+    """Returns the stored embedding of the chunk whose content equals the query."""
+    def __init__(self, chunks, embeddings):
+        self.by_text = {c["content"]: embeddings[i].tolist() for i, c in enumerate(chunks)}
+
+    def embed_text(self, text):
+        return self.by_text[text]
+
+
+# ----------- LocalRetriever -----------
+def test_local_retriever_search_with_build_filter(isolated_modules, chunks, embeddings, tmp_path):
+    retriever = importlib.import_module("retrieval.retriever")
+    store_dir = write_store(chunks, str(tmp_path / "s"), embeddings=embeddings, model_name="stub")
+    local = retriever.LocalRetriever(store_dir, top_k=3, embedder=StubEmbedder(chunks, embeddings))
+
+    target = chunks[10]["metadata"]
+    flt = retriever.build_filter(taxonomy_id=target["taxonomy_id"], section_title=target["section_title"])
+    hits = local.search(chunks[10]["content"], filters=flt)
+
+    assert hits[0]["id"] == target["chunk_id"]
+    assert hits[0]["content"] == chunks[10]["content"]
+    assert 1 <= len(hits) <= 3
+    for h in hits:
+        assert h["metadata"]["taxonomy_id"] == target["taxonomy_id"]
+        assert h["metadata"]["section_title"] == target["section_title"]
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+
+
+def test_store_mask_matches_build_filter(isolated_modules, chunks, tmp_path):
+    retriever = importlib.import_module("retrieval.retriever")
+    store = ChunkStore(write_store(chunks, str(tmp_path / "s")))
+    flt = retriever.build_filter("cat-pharmacy", "prod-pharmacy-pos", "Features")
+    got = np.flatnonzero(store.mask(flt)).tolist()
+    assert got == [
+        i for i, c in enumerate(chunks)
+        if (c["metadata"]["taxonomy_id"], c["metadata"]["product_id"], c["metadata"]["section_title"])
+        == ("cat-pharmacy", "prod-pharmacy-pos", "Features")
+    ]
+    assert got
+    assert store.mask(retriever.build_filter()).all()
+
+
+# ----------- app/main.py -----------
+class RecordingEmbedder:
+    """Stands in for app/embedder.Embedder; records what it was asked to embed."""
+    calls = []
+
+    def embed_dataset(self, dataset):
+        items = list(dataset)
+        RecordingEmbedder.calls.append(items)
+        return [{"id": item["metadata"]["chunk_id"], "values": [0.0] * DIM} for item in items]
+
+
+@pytest.fixture
+def ingest(isolated_modules, monkeypatch):
+    monkeypatch.syspath_prepend(APP_DIR)  # main.py imports its siblings as top-level modules
+    spec = importlib.util.spec_from_file_location("ingest_main", os.path.join(APP_DIR, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    RecordingEmbedder.calls = []
+    monkeypatch.setattr(module, "Embedder", RecordingEmbedder)
+    return module
+
+
+@pytest.fixture
+def dataset_dir(chunks, tmp_path):
+    shutil.copy(CHUNKS_JSONL, tmp_path / "chunks.jsonl")
+    return tmp_path
+
+
+def build_store(ingest, dataset_dir, chunks, embeddings, model_name):
+    jsonl = str(dataset_dir / "chunks.jsonl")
+    store_dir = str(dataset_dir / "chunks.store")
+    write_store(chunks, store_dir, embeddings=embeddings, model_name=model_name, source=source_fingerprint(jsonl))
+    return jsonl, store_dir
+
+
+def test_ingest_reuses_store_embeddings(ingest, dataset_dir, chunks, embeddings):
+    jsonl, store_dir = build_store(ingest, dataset_dir, chunks, embeddings, ingest.DEFAULT_MODEL)
+    vectors = ingest.build_vectors(jsonl, store_dir, DIM)
+    assert RecordingEmbedder.calls == []
+    assert [v["id"] for v in vectors] == [c["metadata"]["chunk_id"] for c in chunks]
+    assert vectors[3]["metadata"] == {**chunks[3]["metadata"], "content": chunks[3]["content"]}
+
+
+def test_ingest_rejects_dim_mismatch(ingest, dataset_dir, chunks, embeddings):
+    jsonl, store_dir = build_store(ingest, dataset_dir, chunks, embeddings, ingest.DEFAULT_MODEL)
+    with pytest.raises(ValueError, match="dim"):
+        ingest.build_vectors(jsonl, store_dir, 384)
+
+
+def test_ingest_reembeds_store_from_other_model(ingest, dataset_dir, chunks, embeddings):
+    jsonl, store_dir = build_store(ingest, dataset_dir, chunks, embeddings, "some-other-model")
+    vectors = ingest.build_vectors(jsonl, store_dir, DIM)
+    assert RecordingEmbedder.calls == [chunks]
+    assert len(vectors) == len(chunks)
+
+
+def test_ingest_falls_back_to_jsonl_when_store_is_stale(ingest, dataset_dir, chunks, embeddings):
+    jsonl, store_dir = build_store(ingest, dataset_dir, chunks, embeddings, ingest.DEFAULT_MODEL)
+    with open(jsonl, "w", encoding="utf-8") as f:  # re-chunked: only the first two chunks remain
+        for c in chunks[:2]:
+            f.write(json.dumps(c, ensure_ascii=False) + "\n")
+    vectors = ingest.build_vectors(jsonl, store_dir, DIM)
+    assert RecordingEmbedder.calls == [chunks[:2]]
+    assert len(vectors) == 2
+
+
+def test_ingest_without_store_uses_jsonl(ingest, dataset_dir, chunks):
+    vectors = ingest.build_vectors(str(dataset_dir / "chunks.jsonl"), str(dataset_dir / "chunks.store"), DIM)
+    assert RecordingEmbedder.calls == [chunks]
+    assert len(vectors) == len(chunks)